@@ -0,0 +1,32 @@
+"""
+Database routers for alx_travel_app project.
+"""
+from django.conf import settings
+
+
+class ReadReplicaRouter:
+    """
+    Route reads to the 'replica' alias when one is configured.
+
+    All list/detail GETs then stop competing with the payment write path
+    for the primary's buffer cache and locks. Writes always go to
+    'default', and write-then-read flows that cannot tolerate replication
+    lag (e.g. re-reading a payment just inserted) should pin themselves
+    with .using('default'). Without a configured replica the router is
+    inert and Django falls back to 'default' for everything.
+    """
+
+    def db_for_read(self, model, **hints):
+        if 'replica' in settings.DATABASES:
+            return 'replica'
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same schema
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == 'default'
@@ -1,44 +1,35 @@
+import os
+
 from django.contrib import admin
-from django.urls import path, include, re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-# Schema view for Swagger/OpenAPI
-try:
-    schema_view = get_schema_view(
-        openapi.Info(
-            title="ALX Travel App API",
-            default_version='v1',
-            description="API documentation for ALX Travel App",
-            terms_of_service="https://www.example.com/terms/",
-            contact=openapi.Contact(email="contact@example.com"),
-            license=openapi.License(name="MIT License"),
-        ),
-        public=True,
-        permission_classes=(permissions.AllowAny,),
+from django.urls import path, include
+from django.conf import settings
+
+
+def _build_docs_urls():
+    """
+    Build the OpenAPI schema and docs URL patterns.
+
+    drf_spectacular is imported lazily here so management commands and
+    workers that never serve the docs don't pay its import cost at startup.
+    """
+    from drf_spectacular.views import (
+        SpectacularAPIView,
+        SpectacularRedocView,
+        SpectacularSwaggerView,
     )
-except Exception as e:
-    print(f"Error creating schema view: {e}")
-    schema_view = None
+
+    return [
+        path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+        path('swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='schema-swagger-ui'),
+        path('redoc/', SpectacularRedocView.as_view(url_name='schema'), name='schema-redoc'),
+    ]
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('listings.urls')),
 ]
 
-# Add Swagger URLs
-if schema_view:
-    urlpatterns += [
-        re_path(r'^swagger(?P<format>\.json|\.yaml)$', 
-                schema_view.without_ui(cache_timeout=0), 
-                name='schema-json'),
-        path('swagger/', 
-             schema_view.with_ui('swagger', cache_timeout=0), 
-             name='schema-swagger-ui'),
-        path('redoc/', 
-             schema_view.with_ui('redoc', cache_timeout=0), 
-             name='schema-redoc'),
-    ]
-else:
-    print("Warning: Swagger/OpenAPI documentation is not available due to configuration errors.")
+# Only mount (and import) the API docs when they are actually wanted
+if settings.DEBUG or os.environ.get('ENABLE_API_DOCS'):
+    urlpatterns += _build_docs_urls()
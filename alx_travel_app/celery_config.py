@@ -2,8 +2,10 @@
 Celery configuration for alx_travel_app project with RabbitMQ
 """
 import os
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_travel_app.settings')
@@ -20,17 +22,63 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
-# Configure Celery to use RabbitMQ
+# Broker/pool tuning lives in settings.py (CELERY_BROKER_*); only options
+# without a settings-namespace key belong here, because this update runs
+# after config_from_object and overrides anything it repeats.
 app.conf.update(
-    broker_connection_retry_on_startup=True,
-    broker_connection_retry=True,
-    broker_connection_max_retries=10,
+    # Ack after the task runs so a crashed worker doesn't drop emails;
+    # lets the I/O-bound email queue run safely with a high prefetch
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
 )
 
 
-@app.task(bind=True, ignore_result=True)
+@worker_process_init.connect
+def _preload_task_modules(**kwargs):
+    """
+    Import the task modules in each forked child at boot, so the first
+    task a child picks up doesn't pay the Django app/task import cost.
+    """
+    app.loader.import_default_modules()
+
+# Suggested worker commands:
+#   emails (I/O-bound: SMTP + DB waits, so an async pool collapses many
+#   in-flight sends onto one process; acks_late makes the high prefetch
+#   safe):
+#     celery -A alx_travel_app worker -Q emails -P gevent -c 200 --prefetch-multiplier=64
+#   default (prefork; keep prefetch low to avoid head-of-line blocking):
+#     celery -A alx_travel_app worker -Q celery -c 4 --prefetch-multiplier=1
+
+
+def publish_batch(task_name, arg_list, queue='emails'):
+    """
+    Publish many task messages on a single pooled AMQP channel.
+
+    Callers that fan out N tasks (e.g. one email per booking in a batch)
+    should prefer this over N ``.delay()`` calls, which each acquire a
+    connection from the pool per message.
+
+    Args:
+        task_name: Fully qualified task name, e.g. 'listings.tasks.send_booking_confirmation_email'
+        arg_list: Iterable of positional-argument tuples, one per task
+        queue: Destination queue name
+    """
+    # send_task builds a proper protocol-2 message (headers, compression,
+    # queue declaration) while the shared producer keeps every publish on
+    # one pooled channel
+    with app.producer_pool.acquire(block=True) as producer:
+        for args in arg_list:
+            app.send_task(
+                task_name,
+                args=list(args),
+                queue=queue,
+                producer=producer,
+            )
+
+
+@app.task(bind=True, ignore_result=False)
 def debug_task(self):
-    """Debug task to test Celery configuration"""
+    """Debug task to test Celery configuration; its result is the probe"""
     print(f'Request: {self.request!r}')
 
 
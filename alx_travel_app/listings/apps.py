@@ -1,6 +1,77 @@
+import logging
+import logging.handlers
+import os
+
 from django.apps import AppConfig
 
+# Started at most once per process
+_log_listeners_started = False
+
+# The at-fork hook is registered once per parent process
+_fork_hook_registered = False
+
+
+def _restart_log_listeners():
+    """
+    Start fresh listener threads in a forked child.
+
+    Threads don't survive fork(): under Celery's prefork pool or gunicorn
+    --preload the listeners started in the parent's ready() are dead in
+    the children, which would otherwise fill the inherited queues and
+    drop every record from the processes doing the actual work.
+    """
+    global _log_listeners_started
+    _log_listeners_started = False
+    _start_log_listeners()
+
+
+def _start_log_listeners():
+    """
+    Start the QueueListener threads that drain the log queues defined in
+    settings into the log files. Request/task threads only enqueue records;
+    all file I/O happens here, off the hot path. Rotation is delegated to
+    logrotate (see logs/logrotate.conf): every process writes the same
+    files, so in-process RotatingFileHandler rotation would race across
+    gunicorn and Celery workers.
+    """
+    global _log_listeners_started, _fork_hook_registered
+    if _log_listeners_started:
+        return
+    _log_listeners_started = True
+
+    if not _fork_hook_registered:
+        _fork_hook_registered = True
+        os.register_at_fork(after_in_child=_restart_log_listeners)
+
+    from django.conf import settings
+
+    settings.LOGS_DIR.mkdir(exist_ok=True)
+
+    fmt = settings.LOGGING['formatters']['verbose']
+    formatter = logging.Formatter(fmt['format'], style=fmt.get('style', '%'))
+
+    for log_queue, filename in (
+        (settings.LOG_QUEUE, 'django.log'),
+        (settings.CELERY_LOG_QUEUE, 'celery.log'),
+    ):
+        # WatchedFileHandler reopens the file when logrotate renames it,
+        # and doesn't stat/rotate in-process on every emit
+        handler = logging.handlers.WatchedFileHandler(
+            settings.LOGS_DIR / filename,
+            delay=True,  # open the file on first record, not at startup
+        )
+        handler.setFormatter(formatter)
+        listener = logging.handlers.QueueListener(
+            log_queue, handler, respect_handler_level=True
+        )
+        listener.start()
+
 
 class ListingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listings'
+
+    def ready(self):
+        _start_log_listeners()
+        # Register the cache-invalidation signal receivers
+        from . import cache  # noqa: F401
@@ -0,0 +1,80 @@
+"""
+Per-user response caching for the read-heavy dashboard endpoints.
+
+Cached entries embed a per-user version number in their key; writes to a
+user's listings/bookings/payments bump the version, so stale entries are
+never served and simply age out of Redis instead of being deleted one by
+one.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Listing, Booking, Payment, User
+
+logger = logging.getLogger(__name__)
+
+# How long cached responses live; the version bump invalidates sooner when
+# the underlying data changes
+RESPONSE_CACHE_TTL = 60
+
+
+def _version_key(user_id):
+    return f'user:{user_id}:v'
+
+
+def user_cache_version(user_id):
+    """Return the current cache version for a user, creating it lazily"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # add() is atomic, so concurrent first reads agree on version 1
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_user_cache_version(user_id):
+    """Invalidate all of a user's cached responses by moving the version"""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 1, None)
+
+
+def user_cache_key(user_id, suffix):
+    """Build a versioned cache key for one user's response fragment"""
+    return f'user:{user_id}:{user_cache_version(user_id)}:{suffix}'
+
+
+@receiver([post_save, post_delete], sender=User, dispatch_uid='cache_user')
+def _invalidate_user(sender, instance, **kwargs):
+    # Profile writes must be visible in the user's own /me response (and
+    # the cached payloads embedding their name/email) immediately
+    bump_user_cache_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Listing, dispatch_uid='cache_listing')
+def _invalidate_listing(sender, instance, **kwargs):
+    bump_user_cache_version(instance.host_id)
+
+
+@receiver([post_save, post_delete], sender=Booking, dispatch_uid='cache_booking')
+def _invalidate_booking(sender, instance, **kwargs):
+    bump_user_cache_version(instance.user_id)
+    host_id = Listing.objects.filter(
+        pk=instance.property_id
+    ).values_list('host_id', flat=True).first()
+    if host_id:
+        bump_user_cache_version(host_id)
+
+
+@receiver([post_save, post_delete], sender=Payment, dispatch_uid='cache_payment')
+def _invalidate_payment(sender, instance, **kwargs):
+    user_id = Booking.objects.filter(
+        pk=instance.booking_id
+    ).values_list('user_id', flat=True).first()
+    if user_id:
+        bump_user_cache_version(user_id)
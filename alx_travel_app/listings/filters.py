@@ -0,0 +1,40 @@
+"""
+Custom filter backends for the listings app.
+"""
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+
+class ListingFullTextSearchFilter(BaseFilterBackend):
+    """
+    Full-text search over Listing name/description/location.
+
+    DRF's SearchFilter emits LIKE '%term%' predicates that can never use a
+    B-tree index, so every search scanned the whole Property table. This
+    backend uses MATCH ... AGAINST on the FULLTEXT index added in migration
+    0003: an index lookup that also yields a relevance score to rank by.
+    Reuses the same ?search= query parameter as the backend it replaces.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '')
+        term = term.strip()
+        if not term:
+            return queryset
+
+        relevance = RawSQL(
+            "MATCH (name, description, location) "
+            "AGAINST (%s IN NATURAL LANGUAGE MODE)",
+            (term,),
+        )
+        queryset = queryset.annotate(relevance=relevance).filter(
+            relevance__gt=0
+        )
+        # Rank by relevance unless the client asked for an explicit order.
+        # This backend must run after OrderingFilter, which reapplies the
+        # view's default -created_at ordering even without an ?ordering=
+        # param and would otherwise clobber the ranking.
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-relevance')
+        return queryset
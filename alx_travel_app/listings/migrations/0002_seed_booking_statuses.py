@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Statuses the views look up by name; seeded here so the hot payment and
+# confirmation paths can use a plain .get() (cached) with no get_or_create
+# write lock on the status table.
+STATUS_NAMES = ['pending', 'confirmed', 'cancelled']
+
+
+def seed_statuses(apps, schema_editor):
+    BookingStatus = apps.get_model('listings', 'BookingStatus')
+    for name in STATUS_NAMES:
+        BookingStatus.objects.get_or_create(status_name=name)
+
+
+def unseed_statuses(apps, schema_editor):
+    BookingStatus = apps.get_model('listings', 'BookingStatus')
+    BookingStatus.objects.filter(status_name__in=STATUS_NAMES).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_statuses, unseed_statuses),
+    ]
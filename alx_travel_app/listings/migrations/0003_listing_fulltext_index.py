@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_seed_booking_statuses'),
+    ]
+
+    # MySQL FULLTEXT indexes are not expressible through Django's Index
+    # classes, so raw SQL it is; the table name comes from Listing.Meta.
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                "CREATE FULLTEXT INDEX listing_search_ft "
+                "ON Property (name, description, location)"
+            ),
+            reverse_sql="DROP INDEX listing_search_ft ON Property",
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_listing_fulltext_index'),
+    ]
+
+    # The single-column host/property/user indexes are replaced by
+    # composite (FK, -created_at) ones: the leftmost prefix keeps serving
+    # plain FK filters, and the second column satisfies the viewsets'
+    # default -created_at ordering without a filesort.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='Property_host_id_426217_idx',
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['host', '-created_at'], name='listing_host_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['-created_at'], name='listing_created_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='Booking_propert_52dd3c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='Booking_user_id_8579ae_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', '-created_at'], name='booking_prop_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status_info', 'user'], name='booking_status_user_idx'),
+        ),
+    ]
@@ -55,9 +55,13 @@ class Listing(models.Model):
     class Meta:
         db_table = 'Property'
         indexes = [
-            models.Index(fields=['host']),
+            # (host, -created_at) serves both plain host filters (leftmost
+            # prefix) and the host listing pages' default ordering
+            models.Index(fields=['host', '-created_at'], name='listing_host_created_idx'),
             models.Index(fields=['location']),
             models.Index(fields=['price_per_night']),
+            # Default list ordering
+            models.Index(fields=['-created_at'], name='listing_created_idx'),
         ]
 
     def __str__(self):
@@ -128,9 +132,14 @@ class Booking(models.Model):
     class Meta:
         db_table = 'Booking'
         indexes = [
-            models.Index(fields=['property']),
-            models.Index(fields=['user']),
+            # Composite (FK, -created_at) indexes cover the plain FK
+            # filters via their leftmost prefix and additionally satisfy
+            # the viewset's default -created_at ordering without a filesort
+            models.Index(fields=['property', '-created_at'], name='booking_prop_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
             models.Index(fields=['start_date', 'end_date']),
+            # status_info__status_name filter combined with the per-user scope
+            models.Index(fields=['status_info', 'user'], name='booking_status_user_idx'),
         ]
         constraints = [
             models.CheckConstraint(
@@ -31,6 +31,15 @@ class PaymentVerifyResponseSerializer(serializers.Serializer):
     chapa_status = serializers.CharField()
     verification_data = serializers.DictField()
 
+class WebhookSerializer(serializers.Serializer):
+    """
+    Serializer for Chapa webhook payloads; validates up-front so the view
+    fails fast instead of discovering missing fields mid-processing
+    """
+    tx_ref = serializers.CharField(required=True)
+    status = serializers.CharField(required=False, allow_blank=True)
+
+
 class PaymentListSerializer(serializers.ModelSerializer):
     """
     Serializer for listing payments
@@ -57,7 +57,7 @@ class ListingSerializer(serializers.ModelSerializer):
     Serializer for Listing model
     """
     host = UserSerializer(read_only=True)
-    average_rating = serializers.ReadOnlyField()
+    average_rating = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
     reviews = ReviewSerializer(many=True, read_only=True)
 
@@ -70,16 +70,36 @@ class ListingSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['property_id', 'created_at', 'updated_at']
 
+    def get_average_rating(self, obj) -> float:
+        """Return the average review rating for the listing.
+
+        Args:
+            obj: The listing instance
+
+        Returns:
+            float: The SQL-annotated average when the queryset provides it,
+            otherwise the model property computed from prefetched reviews
+        """
+        avg = getattr(obj, 'avg_rating', None)
+        if avg is not None:
+            return float(avg)
+        return obj.average_rating
+
     def get_reviews_count(self, obj) -> int:
         """Return the count of reviews for the listing.
-        
+
         Args:
             obj: The listing instance
-            
+
         Returns:
-            int: The number of reviews for the listing
+            int: The SQL-annotated count when the queryset provides it,
+            otherwise counted from the prefetched reviews without an extra
+            COUNT query
         """
-        return obj.reviews.count()
+        count = getattr(obj, 'review_count', None)
+        if count is not None:
+            return count
+        return len(obj.reviews.all())
 
 
 class ListingCreateUpdateSerializer(serializers.ModelSerializer):
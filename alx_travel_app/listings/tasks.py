@@ -1,202 +1,451 @@
-"""
-Celery tasks for background processing
-"""
-from celery import shared_task
-from django.core.mail import send_mail
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-import logging
-
-logger = logging.getLogger(__name__)
-
-
-@shared_task
-def send_payment_confirmation_email(payment_id):
-    """
-    Send payment confirmation email to user
-    
-    Args:
-        payment_id: UUID of the payment
-    """
-    try:
-        from .models import Payment
-        
-        payment = Payment.objects.select_related(
-            'booking', 'booking__user', 'booking__property'
-        ).get(payment_id=payment_id)
-        
-        user = payment.booking.user
-        booking = payment.booking
-        
-        subject = f'Payment Confirmation - Booking #{booking.booking_id}'
-        
-        # Create HTML email content
-        html_message = f"""
-        <html>
-        <body>
-            <h2>Payment Confirmed!</h2>
-            <p>Dear {user.first_name} {user.last_name},</p>
-            <p>Your payment has been successfully processed.</p>
-            
-            <h3>Booking Details:</h3>
-            <ul>
-                <li><strong>Property:</strong> {booking.property.name}</li>
-                <li><strong>Location:</strong> {booking.property.location}</li>
-                <li><strong>Check-in:</strong> {booking.start_date}</li>
-                <li><strong>Check-out:</strong> {booking.end_date}</li>
-                <li><strong>Duration:</strong> {booking.duration_days} nights</li>
-            </ul>
-            
-            <h3>Payment Details:</h3>
-            <ul>
-                <li><strong>Amount Paid:</strong> {payment.currency} {payment.amount}</li>
-                <li><strong>Transaction ID:</strong> {payment.transaction_id}</li>
-                <li><strong>Payment Date:</strong> {payment.payment_date.strftime('%Y-%m-%d %H:%M')}</li>
-            </ul>
-            
-            <p>Thank you for choosing our service!</p>
-            <p>Best regards,<br>ALX Travel Team</p>
-        </body>
-        </html>
-        """
-        
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        
-        logger.info(f"Payment confirmation email sent to {user.email}")
-        return f"Email sent to {user.email}"
-        
-    except Exception as e:
-        logger.error(f"Error sending payment confirmation email: {str(e)}")
-        raise
-
-
-@shared_task
-def send_booking_confirmation_email(booking_id):
-    """
-    Send booking confirmation email to user
-    
-    Args:
-        booking_id: UUID of the booking
-    """
-    try:
-        from .models import Booking
-        
-        booking = Booking.objects.select_related(
-            'user', 'property', 'property__host'
-        ).get(booking_id=booking_id)
-        
-        user = booking.user
-        
-        subject = f'Booking Confirmed - {booking.property.name}'
-        
-        html_message = f"""
-        <html>
-        <body>
-            <h2>Booking Confirmed!</h2>
-            <p>Dear {user.first_name} {user.last_name},</p>
-            <p>Your booking has been confirmed by the host.</p>
-            
-            <h3>Booking Details:</h3>
-            <ul>
-                <li><strong>Property:</strong> {booking.property.name}</li>
-                <li><strong>Location:</strong> {booking.property.location}</li>
-                <li><strong>Check-in:</strong> {booking.start_date}</li>
-                <li><strong>Check-out:</strong> {booking.end_date}</li>
-                <li><strong>Total Price:</strong> ETB {booking.total_price}</li>
-            </ul>
-            
-            <h3>Host Information:</h3>
-            <ul>
-                <li><strong>Name:</strong> {booking.property.host.first_name} {booking.property.host.last_name}</li>
-                <li><strong>Email:</strong> {booking.property.host.email}</li>
-                <li><strong>Phone:</strong> {booking.property.host.phone_number or 'N/A'}</li>
-            </ul>
-            
-            <p>We hope you have a wonderful stay!</p>
-            <p>Best regards,<br>ALX Travel Team</p>
-        </body>
-        </html>
-        """
-        
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        
-        logger.info(f"Booking confirmation email sent to {user.email}")
-        return f"Email sent to {user.email}"
-        
-    except Exception as e:
-        logger.error(f"Error sending booking confirmation email: {str(e)}")
-        raise
-
-
-@shared_task
-def send_payment_failed_email(payment_id):
-    """
-    Send payment failed notification email to user
-    
-    Args:
-        payment_id: UUID of the payment
-    """
-    try:
-        from .models import Payment
-        
-        payment = Payment.objects.select_related(
-            'booking', 'booking__user'
-        ).get(payment_id=payment_id)
-        
-        user = payment.booking.user
-        
-        subject = 'Payment Failed - Action Required'
-        
-        html_message = f"""
-        <html>
-        <body>
-            <h2>Payment Failed</h2>
-            <p>Dear {user.first_name} {user.last_name},</p>
-            <p>Unfortunately, your payment could not be processed.</p>
-            
-            <p><strong>Booking Reference:</strong> {payment.booking.booking_id}</p>
-            <p><strong>Amount:</strong> {payment.currency} {payment.amount}</p>
-            
-            <p>Please try again or contact our support team for assistance.</p>
-            
-            <p>Best regards,<br>ALX Travel Team</p>
-        </body>
-        </html>
-        """
-        
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        
-        logger.info(f"Payment failed email sent to {user.email}")
-        return f"Email sent to {user.email}"
-        
-    except Exception as e:
-        logger.error(f"Error sending payment failed email: {str(e)}")
-        raise
\ No newline at end of file
+"""
+Celery tasks for background processing
+"""
+import threading
+from smtplib import SMTPException
+
+from celery import shared_task
+from celery.signals import worker_process_shutdown
+from django.apps import apps
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.mail import get_connection, EmailMultiAlternatives
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.template.loader import render_to_string
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Retry transient infrastructure failures (SMTP 421/timeouts, DB blips) with
+# jittered exponential backoff; 11 retries capped at 600s spans roughly a
+# 30-minute window before an email is declared lost.
+_RETRY_KWARGS = {
+    'bind': True,
+    'autoretry_for': (SMTPException, OperationalError, ConnectionError),
+    'retry_backoff': True,
+    'retry_backoff_max': 600,
+    'retry_jitter': True,
+    'max_retries': 11,
+}
+
+# Smooth event storms in the worker scheduler instead of letting the SMTP
+# provider throttle us with 421s; adjust to the provider's per-account cap.
+_EMAIL_TASK_KWARGS = {**_RETRY_KWARGS, 'rate_limit': '20/s'}
+
+# Providers cap messages per SMTP connection (e.g. SendGrid at 5k); recycle
+# well before that so a long-lived worker never hits the cap mid-send.
+_MAX_MESSAGES_PER_CONNECTION = 1000
+
+# Per-thread SMTP connection state, so each worker thread reuses one
+# connection across tasks instead of paying TCP+TLS+AUTH per email
+_mail_state = threading.local()
+
+
+def _get_mail_connection(message_count=1):
+    """
+    Return a reusable SMTP connection for the current worker thread.
+
+    The connection is opened once and reused across task executions; stale
+    sockets are detected with a NOOP and recycled transparently. It is also
+    recycled after _MAX_MESSAGES_PER_CONNECTION messages so provider
+    per-connection caps are never hit mid-send.
+
+    Args:
+        message_count: How many messages the caller is about to send on it
+    """
+    conn = getattr(_mail_state, 'connection', None)
+    sent = getattr(_mail_state, 'sent_count', 0)
+    if conn is not None and sent + message_count > _MAX_MESSAGES_PER_CONNECTION:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        conn = None
+        sent = 0
+    if conn is not None:
+        try:
+            if conn.connection is not None:
+                conn.connection.noop()
+            _mail_state.sent_count = sent + message_count
+            return conn
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            sent = 0
+    conn = get_connection()
+    conn.open()
+    _mail_state.connection = conn
+    _mail_state.sent_count = sent + message_count
+    return conn
+
+
+@worker_process_shutdown.connect
+def _close_mail_connection(**kwargs):
+    """Close the pooled SMTP connection when a worker process exits"""
+    conn = getattr(_mail_state, 'connection', None)
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        _mail_state.connection = None
+        _mail_state.sent_count = 0
+
+
+# Narrow column projections for the email queries: the templates only touch
+# a handful of fields, so skip wide columns (descriptions, password hashes)
+# instead of pulling every column of four joined tables. duration_days is
+# computed in Python from start_date/end_date, so no extra column is needed.
+_PAYMENT_EMAIL_FIELDS = (
+    'amount', 'currency', 'transaction_id', 'payment_date',
+    'booking__booking_id', 'booking__start_date', 'booking__end_date',
+    'booking__user__first_name', 'booking__user__last_name',
+    'booking__user__email',
+    'booking__property__name', 'booking__property__location',
+)
+
+_BOOKING_EMAIL_FIELDS = (
+    'booking_id', 'start_date', 'end_date', 'total_price',
+    'user__first_name', 'user__last_name', 'user__email',
+    'property__name', 'property__location',
+    'property__host__first_name', 'property__host__last_name',
+    'property__host__email', 'property__host__phone_number',
+)
+
+
+# Model classes resolved once per process via the app registry. Importing
+# .models at module level would race Celery boot; resolving lazily through
+# apps.get_model avoids that without paying an import lookup per task call.
+_models = {}
+
+
+def _m(name):
+    """Return a listings model class, cached for the worker's lifetime"""
+    try:
+        return _models[name]
+    except KeyError:
+        return _models.setdefault(name, apps.get_model('listings', name))
+
+
+def _field(obj, name):
+    """Read a field off either a model instance or a serialized context dict"""
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def _serialize_booking_context(booking):
+    """
+    Build a JSON-safe context dict for a booking email from objects the
+    caller already holds, so the worker can render without re-querying.
+    """
+    prop = booking.property
+    host = prop.host
+    user = booking.user
+    return {
+        'user': {
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email,
+        },
+        'booking': {
+            'booking_id': str(booking.booking_id),
+            'start_date': booking.start_date.isoformat(),
+            'end_date': booking.end_date.isoformat(),
+            'total_price': str(booking.total_price),
+            'get_duration_days': booking.get_duration_days(),
+            'property': {
+                'name': prop.name,
+                'location': prop.location,
+                'host': {
+                    'first_name': host.first_name,
+                    'last_name': host.last_name,
+                    'email': host.email,
+                    'phone_number': host.phone_number,
+                },
+            },
+        },
+    }
+
+
+def _serialize_payment_context(payment):
+    """
+    Build a JSON-safe context dict for a payment email from objects the
+    caller already holds, so the worker can render without re-querying.
+    """
+    context = _serialize_booking_context(payment.booking)
+    context['payment'] = {
+        'amount': str(payment.amount),
+        'currency': payment.currency,
+        'transaction_id': payment.transaction_id,
+        'payment_date': payment.payment_date.isoformat() if payment.payment_date else None,
+        'booking': {'booking_id': context['booking']['booking_id']},
+    }
+    return context
+
+
+def _revive_context(context):
+    """Turn the ISO date strings in a serialized context back into objects"""
+    from datetime import date, datetime
+
+    booking = context.get('booking')
+    if booking:
+        for key in ('start_date', 'end_date'):
+            if isinstance(booking.get(key), str):
+                booking[key] = date.fromisoformat(booking[key])
+    payment = context.get('payment')
+    if payment and isinstance(payment.get('payment_date'), str):
+        payment['payment_date'] = datetime.fromisoformat(payment['payment_date'])
+    return context
+
+
+def _load_payment_ctx(payment_id):
+    """Load the template context for a payment-related email"""
+    payment = _m('Payment').objects.select_related(
+        'booking', 'booking__user', 'booking__property'
+    ).only(*_PAYMENT_EMAIL_FIELDS).get(payment_id=payment_id)
+    booking = payment.booking
+    return {'user': booking.user, 'booking': booking, 'payment': payment}
+
+
+def _load_booking_ctx(booking_id):
+    """Load the template context for a booking-related email"""
+    booking = _m('Booking').objects.select_related(
+        'user', 'property', 'property__host'
+    ).only(*_BOOKING_EMAIL_FIELDS).get(booking_id=booking_id)
+    return {'user': booking.user, 'booking': booking}
+
+
+# Subject skeletons parsed once at import time; per-call work is a single
+# bound .format() call instead of rebuilding the f-string bytecode path.
+_PAYMENT_SUBJECT_FMT = 'Payment Confirmation - Booking #{}'.format
+_BOOKING_SUBJECT_FMT = 'Booking Confirmed - {}'.format
+_PAYMENT_FAILED_SUBJECT = 'Payment Failed - Action Required'
+
+# One entry per email type: how to load its context and build its subject.
+# The template pair is derived from the key (emails/<key>.html / .txt).
+EMAIL_TEMPLATES = {
+    'payment_confirmation': {
+        'loader': _load_payment_ctx,
+        'subject': lambda ctx: _PAYMENT_SUBJECT_FMT(_field(ctx['booking'], 'booking_id')),
+        'description': 'payment confirmation',
+    },
+    'booking_confirmation': {
+        'loader': _load_booking_ctx,
+        'subject': lambda ctx: _BOOKING_SUBJECT_FMT(_field(_field(ctx['booking'], 'property'), 'name')),
+        'description': 'booking confirmation',
+    },
+    'payment_failed': {
+        'loader': _load_payment_ctx,
+        'subject': lambda ctx: _PAYMENT_FAILED_SUBJECT,
+        'description': 'payment failed',
+    },
+}
+
+
+def _send_templated_email(template_key, object_id, context=None):
+    """
+    Load, render and send a single templated email.
+
+    All three notification tasks funnel through here, so connection reuse,
+    cached templates and any future tuning apply in one place.
+
+    Args:
+        template_key: Key into EMAIL_TEMPLATES
+        object_id: UUID of the payment/booking the email is about
+        context: Optional pre-serialized context dict from the caller; when
+            given, the worker-side DB fetch is skipped entirely
+    """
+    entry = EMAIL_TEMPLATES[template_key]
+    if context is not None:
+        context = _revive_context(context)
+    else:
+        try:
+            context = entry['loader'](object_id)
+        except ObjectDoesNotExist:
+            # Unrecoverable: retrying won't make the row appear, so don't
+            # burn the retry budget on it
+            logger.error("Cannot send %s email: object %s not found",
+                         entry['description'], object_id)
+            return f"Object {object_id} not found"
+
+    recipient = _field(context['user'], 'email')
+
+    msg = _build_email(entry['subject'](context), template_key, context, recipient)
+    msg.connection = _get_mail_connection()
+    msg.send(fail_silently=False)
+
+    logger.info("%s email sent to %s", entry['description'].capitalize(), recipient)
+    return f"Email sent to {recipient}"
+
+
+@shared_task(**_EMAIL_TASK_KWARGS)
+def send_payment_confirmation_email(self, payment_id=None, context=None):
+    """
+    Send payment confirmation email to user
+
+    Args:
+        payment_id: UUID of the payment
+        context: Optional dict from _serialize_payment_context; when the
+            caller already holds the rows, passing it skips the worker-side
+            SELECT. payment_id alone still works for retry/replay.
+    """
+    return _send_templated_email('payment_confirmation', payment_id, context)
+
+
+@shared_task(**_EMAIL_TASK_KWARGS)
+def send_booking_confirmation_email(self, booking_id=None, context=None):
+    """
+    Send booking confirmation email to user
+
+    Args:
+        booking_id: UUID of the booking
+        context: Optional dict from _serialize_booking_context (see
+            send_payment_confirmation_email)
+    """
+    return _send_templated_email('booking_confirmation', booking_id, context)
+
+
+@shared_task(**_EMAIL_TASK_KWARGS)
+def send_payment_failed_email(self, payment_id=None, context=None):
+    """
+    Send payment failed notification email to user
+
+    Args:
+        payment_id: UUID of the payment
+        context: Optional dict from _serialize_payment_context (see
+            send_payment_confirmation_email)
+    """
+    return _send_templated_email('payment_failed', payment_id, context)
+
+
+@shared_task(**_RETRY_KWARGS)
+def send_email_batch(self, template_key, object_ids):
+    """
+    Send a batch of templated emails over a single SMTP session.
+
+    Callers that fan out many notifications should enqueue one batch task
+    (e.g. via publish_batch) instead of one task per email: the batch does
+    one IN-query for all rows and one send_messages() call, so the SMTP
+    handshake and DB roundtrips are amortized across the whole batch.
+
+    Args:
+        template_key: One of 'payment_confirmation', 'booking_confirmation',
+            'payment_failed'
+        object_ids: List of payment/booking UUIDs (as strings)
+    """
+    entry = EMAIL_TEMPLATES[template_key]
+    messages = []
+    if template_key == 'booking_confirmation':
+        rows = _m('Booking').objects.select_related(
+            'user', 'property', 'property__host'
+        ).only(*_BOOKING_EMAIL_FIELDS).filter(booking_id__in=object_ids)
+        contexts = [{'user': b.user, 'booking': b} for b in rows]
+    else:
+        rows = _m('Payment').objects.select_related(
+            'booking', 'booking__user', 'booking__property'
+        ).only(*_PAYMENT_EMAIL_FIELDS).filter(payment_id__in=object_ids)
+        contexts = [
+            {'user': p.booking.user, 'booking': p.booking, 'payment': p}
+            for p in rows
+        ]
+
+    for context in contexts:
+        messages.append(_build_email(
+            entry['subject'](context),
+            template_key,
+            context,
+            context['user'].email,
+        ))
+
+    if messages:
+        _get_mail_connection(len(messages)).send_messages(messages)
+
+    logger.info("Sent batch of %d %s emails", len(messages), template_key)
+    return f"Sent {len(messages)} emails"
+
+
+@shared_task(**_RETRY_KWARGS)
+def process_payment_verification(self, tx_ref):
+    """
+    Verify a Chapa transaction and apply the outcome off the request path.
+
+    The webhook view acks immediately and enqueues this task, so gunicorn
+    workers are never blocked on the Chapa round-trip; transient Chapa
+    failures ride the task retry policy instead of surfacing as webhook
+    errors.
+
+    Args:
+        tx_ref: Chapa transaction reference from the webhook payload
+    """
+    from .cache import bump_user_cache_version
+    from .services import get_chapa_service
+    from .views import get_booking_status
+
+    verification = get_chapa_service().verify_payment(tx_ref)
+    if verification['status'] == 'error':
+        # Treat as transient so the autoretry policy re-attempts it
+        raise ConnectionError(verification['message'])
+
+    payment_data = verification.get('data', {})
+    chapa_status = payment_data.get('status', '').lower()
+
+    Payment = _m('Payment')
+    # Lock the payment row so a concurrent duplicate delivery serializes
+    # behind this one and then short-circuits on the completed check; the
+    # Chapa round-trip above deliberately ran before the lock was taken.
+    # Pinned to the primary: a FOR UPDATE routed to a replica would lock
+    # the wrong server (or fail outright on a read-only one).
+    with transaction.atomic():
+        try:
+            payment = Payment.objects.using('default').select_for_update(
+            ).select_related('booking').get(chapa_reference=tx_ref)
+        except ObjectDoesNotExist:
+            logger.error("Payment not found for tx_ref: %s", tx_ref)
+            return f"Payment not found for {tx_ref}"
+
+        if payment.payment_status == 'completed':
+            logger.info("Payment %s already completed; duplicate webhook ignored",
+                        payment.payment_id)
+            return f"Already completed: {tx_ref}"
+
+        payment_id = str(payment.payment_id)
+        if chapa_status == 'success':
+            # Targeted UPDATEs on the changed columns only
+            Payment.objects.filter(pk=payment.pk).update(
+                payment_status='completed',
+                transaction_id=payment_data.get('reference'),
+            )
+            _m('Booking').objects.filter(pk=payment.booking_id).update(
+                status_info=get_booking_status('confirmed')
+            )
+            # Queue the email on commit so the worker never sees a
+            # pre-commit row
+            transaction.on_commit(
+                lambda: send_payment_confirmation_email.delay(payment_id)
+            )
+            logger.info("Webhook: Payment completed %s", payment.payment_id)
+
+        elif chapa_status == 'failed':
+            Payment.objects.filter(pk=payment.pk).update(payment_status='failed')
+            transaction.on_commit(
+                lambda: send_payment_failed_email.delay(payment_id)
+            )
+            logger.warning("Webhook: Payment failed %s", payment.payment_id)
+
+    if chapa_status in ('success', 'failed'):
+        # update() skips signals, so invalidate cached responses directly
+        bump_user_cache_version(payment.booking.user_id)
+
+    return f"Processed {tx_ref}: {chapa_status}"
+
+
+def _build_email(subject, template_key, context, recipient):
+    """Build an EmailMultiAlternatives from the given email template pair"""
+    html_message = render_to_string(f'emails/{template_key}.html', context)
+    plain_message = render_to_string(f'emails/{template_key}.txt', context)
+    msg = EmailMultiAlternatives(
+        subject, plain_message, settings.EMAIL_HOST_USER, [recipient]
+    )
+    msg.attach_alternative(html_message, 'text/html')
+    return msg
@@ -5,21 +5,30 @@ from rest_framework import viewsets, status, filters, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404
-from django.db import models
+from rest_framework.renderers import JSONRenderer
+from django.http import HttpResponse
+from django.core.cache import cache
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
+from django.utils import timezone
+from functools import lru_cache
+import hashlib
+import hmac
+from .cache import RESPONSE_CACHE_TTL, bump_user_cache_version, user_cache_key
 import logging
 from .payment_serializers import (
-    PaymentInitiateSerializer, 
+    PaymentInitiateSerializer,
     PaymentResponseSerializer,
     PaymentVerifyResponseSerializer,
-    PaymentListSerializer
+    PaymentListSerializer,
+    WebhookSerializer
+)
+from .tasks import (
+    send_payment_confirmation_email,
+    send_payment_failed_email,
+    process_payment_verification,
 )
-from .tasks import send_payment_confirmation_email, send_payment_failed_email
-from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import Listing, Booking, Review, User, BookingStatus, Payment, PaymentMethod
@@ -33,13 +42,88 @@ from .serializers import (
     UserCreateSerializer,
     PaymentSerializer
 )
+from .filters import ListingFullTextSearchFilter
 from .permissions import IsOwnerOrReadOnly, IsHostOrReadOnly
-from .services import ChapaService
-from .tasks import send_payment_confirmation_email, send_payment_failed_email
-import logging
+from .services import get_chapa_service
 
 logger = logging.getLogger(__name__)
 
+# Shared narrow queryset for nested review serialization: only the columns
+# ReviewSerializer (and its nested user) touch. FK columns stay in the
+# projection so Django can stitch prefetch results back onto their parents.
+_REVIEW_QS = Review.objects.select_related('user').only(
+    'review_id', 'rating', 'comment', 'created_at', 'property',
+    'user__user_id', 'user__first_name', 'user__last_name',
+    'user__email', 'user__phone_number', 'user__created_at',
+)
+
+# User columns consumed by the nested UserSerializer
+_HOST_FIELDS = (
+    'user_id', 'first_name', 'last_name', 'email', 'phone_number',
+    'created_at',
+)
+
+# Resolved once per process; read on the payment-initiate hot path
+_FRONTEND_URL = settings.FRONTEND_URL
+
+# Pre-encoded webhook HMAC key; empty when signature checking is disabled
+_WEBHOOK_SECRET = settings.CHAPA_WEBHOOK_SECRET.encode()
+
+# Webhook callback URLs keyed by (scheme, host); the path is fixed, so
+# there is no need to re-run build_absolute_uri's urljoin/IRI encoding
+# on every initiation
+_WEBHOOK_URLS = {}
+
+
+def _webhook_url(request):
+    """Return the absolute webhook callback URL, cached per scheme+host."""
+    key = (request.scheme, request.get_host())
+    url = _WEBHOOK_URLS.get(key)
+    if url is None:
+        url = f"{key[0]}://{key[1]}/api/payments/webhook/"
+        _WEBHOOK_URLS[key] = url
+    return url
+
+
+def _etag_json_response(request, payload):
+    """
+    Wrap already-rendered JSON bytes in an HttpResponse with an ETag.
+
+    The ETag is a hash of the cached bytes, so clients holding the current
+    payload (If-None-Match matches) get an empty 304 and skip the body
+    transfer entirely.
+    """
+    etag = '"%s"' % hashlib.md5(payload).hexdigest()
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(payload, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+@lru_cache(maxsize=8)
+def get_booking_status(name):
+    """
+    Return the BookingStatus row for a status name, cached per process.
+
+    Status rows are constant reference data (seeded in migration 0002), so
+    repeated lookups on the confirm/cancel/payment paths would otherwise be
+    a redundant DB roundtrip per request.
+    """
+    return BookingStatus.objects.get(status_name=name)
+
+
+@lru_cache(maxsize=4)
+def get_payment_method(name):
+    """
+    Return the PaymentMethod row for a method name, cached per process.
+
+    Like booking statuses these are constant reference rows; caching spares
+    the payment-initiate hot path a get_or_create roundtrip per request.
+    """
+    return PaymentMethod.objects.get_or_create(method_name=name)[0]
+
 
 class UserViewSet(viewsets.ModelViewSet):
     """
@@ -70,8 +154,12 @@ class UserViewSet(viewsets.ModelViewSet):
         Get current user's profile
         Endpoint: GET /api/users/me/
         """
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        key = user_cache_key(request.user.user_id, 'me')
+        data = cache.get(key)
+        if data is None:
+            data = self.get_serializer(request.user).data
+            cache.set(key, data, RESPONSE_CACHE_TTL)
+        return Response(data)
 
     @action(detail=True, methods=['get'])
     def listings(self, request, user_id=None):
@@ -80,9 +168,32 @@ class UserViewSet(viewsets.ModelViewSet):
         Endpoint: GET /api/users/{user_id}/listings/
         """
         user = self.get_object()
-        listings = Listing.objects.filter(host=user)
-        serializer = ListingSerializer(listings, many=True)
-        return Response(serializer.data)
+        # Cache the rendered bytes under the user's version key: a hit
+        # skips the query and the whole serialization/render pass, and
+        # listing writes invalidate via the post_save version bump
+        key = user_cache_key(
+            user.user_id, f'listings:{request.query_params.urlencode()}'
+        )
+        payload = cache.get(key)
+        if payload is None:
+            listings = Listing.objects.filter(host=user).select_related(
+                'host'
+            ).prefetch_related(
+                models.Prefetch('reviews', queryset=_REVIEW_QS)
+            ).annotate(
+                avg_rating=models.Avg('reviews__rating'),
+                review_count=models.Count('reviews'),
+            )
+            page = self.paginate_queryset(listings)
+            if page is not None:
+                data = self.get_paginated_response(
+                    ListingSerializer(page, many=True).data
+                ).data
+            else:
+                data = ListingSerializer(listings, many=True).data
+            payload = JSONRenderer().render(data)
+            cache.set(key, payload, RESPONSE_CACHE_TTL)
+        return _etag_json_response(request, payload)
 
     @action(detail=True, methods=['get'])
     def bookings(self, request, user_id=None):
@@ -91,7 +202,17 @@ class UserViewSet(viewsets.ModelViewSet):
         Endpoint: GET /api/users/{user_id}/bookings/
         """
         user = self.get_object()
-        bookings = Booking.objects.filter(user=user)
+        # BookingSerializer nests the full listing (host, reviews and
+        # their users), so eager-load the same graph as BookingViewSet
+        bookings = Booking.objects.filter(user=user).select_related(
+            'property', 'property__host', 'user', 'status_info'
+        ).prefetch_related(
+            models.Prefetch('property__reviews', queryset=_REVIEW_QS)
+        )
+        page = self.paginate_queryset(bookings)
+        if page is not None:
+            serializer = BookingSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = BookingSerializer(bookings, many=True)
         return Response(serializer.data)
 
@@ -108,15 +229,21 @@ class ListingViewSet(viewsets.ModelViewSet):
     Partial Update: PATCH /api/listings/{property_id}/
     Delete: DELETE /api/listings/{property_id}/
     """
-    queryset = Listing.objects.all().select_related('host').prefetch_related('reviews')
+    queryset = Listing.objects.all().select_related('host').only(
+        'property_id', 'name', 'description', 'location', 'price_per_night',
+        'created_at', 'updated_at',
+        *[f'host__{f}' for f in _HOST_FIELDS],
+    ).prefetch_related(models.Prefetch('reviews', queryset=_REVIEW_QS))
     serializer_class = ListingSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsHostOrReadOnly]
     lookup_field = 'property_id'
     
-    # Add filtering, searching, and ordering
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Add filtering, searching, and ordering; search uses the FULLTEXT
+    # index instead of DRF's unindexable LIKE '%term%' scan. The search
+    # backend runs last so its relevance ranking survives OrderingFilter's
+    # default -created_at ordering.
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ListingFullTextSearchFilter]
     filterset_fields = ['location', 'price_per_night']
-    search_fields = ['name', 'description', 'location']
     ordering_fields = ['price_per_night', 'created_at', 'name']
     ordering = ['-created_at']  # Default ordering
 
@@ -138,8 +265,13 @@ class ListingViewSet(viewsets.ModelViewSet):
         """
         Optionally filter listings by price range
         """
-        queryset = super().get_queryset()
-        
+        # Aggregate ratings in SQL: one pass instead of a COUNT query and a
+        # Python averaging loop per listing
+        queryset = super().get_queryset().annotate(
+            avg_rating=models.Avg('reviews__rating'),
+            review_count=models.Count('reviews'),
+        )
+
         # Filter by minimum price
         min_price = self.request.query_params.get('min_price')
         if min_price:
@@ -152,6 +284,21 @@ class ListingViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get a single listing, serving rendered JSON from cache
+        Endpoint: GET /api/listings/{property_id}/
+        """
+        listing = self.get_object()
+        # The key embeds updated_at, so any write that bumps the timestamp
+        # starts a fresh entry and the stale one just expires
+        key = f'listing:{listing.property_id}:detail:v{listing.updated_at.timestamp()}'
+        payload = cache.get(key)
+        if payload is None:
+            payload = JSONRenderer().render(self.get_serializer(listing).data)
+            cache.set(key, payload, 300)
+        return _etag_json_response(request, payload)
+
     @action(detail=True, methods=['get'])
     def reviews(self, request, property_id=None):
         """
@@ -159,9 +306,23 @@ class ListingViewSet(viewsets.ModelViewSet):
         Endpoint: GET /api/listings/{property_id}/reviews/
         """
         listing = self.get_object()
-        reviews = listing.reviews.all()
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        key = (
+            f'listing:{listing.property_id}:reviews:'
+            f'v{listing.updated_at.timestamp()}:{request.query_params.urlencode()}'
+        )
+        payload = cache.get(key)
+        if payload is None:
+            reviews = listing.reviews.all()
+            page = self.paginate_queryset(reviews)
+            if page is not None:
+                data = self.get_paginated_response(
+                    ReviewSerializer(page, many=True).data
+                ).data
+            else:
+                data = ReviewSerializer(reviews, many=True).data
+            payload = JSONRenderer().render(data)
+            cache.set(key, payload, 300)
+        return _etag_json_response(request, payload)
 
     @action(detail=True, methods=['post'])
     def add_review(self, request, property_id=None):
@@ -171,17 +332,24 @@ class ListingViewSet(viewsets.ModelViewSet):
         Body: {"rating": 5, "comment": "Great place!"}
         """
         listing = self.get_object()
-        
-        # Check if user has already reviewed this property
-        if Review.objects.filter(property=listing, user=request.user).exists():
-            return Response(
-                {'error': 'You have already reviewed this property'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
+
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(property=listing, user=request.user)
+            # Rely on the unique_user_property_review constraint instead of
+            # a separate exists() check: one INSERT, no race window between
+            # check and save
+            try:
+                serializer.save(property=listing, user=request.user)
+            except IntegrityError:
+                return Response(
+                    {'error': 'You have already reviewed this property'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Bump updated_at so the timestamp-keyed detail/reviews cache
+            # entries roll over (update() bypasses auto_now, hence explicit)
+            Listing.objects.filter(pk=listing.pk).update(
+                updated_at=timezone.now()
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -193,14 +361,21 @@ class ListingViewSet(viewsets.ModelViewSet):
         """
         listing = self.get_object()
         
-        # Only allow host to see all bookings
-        if request.user != listing.host:
+        # Only allow host to see all bookings; comparing pks avoids User
+        # __eq__ and any related-object dereference
+        if request.user.user_id != listing.host_id:
             return Response(
                 {'error': 'Only the host can view all bookings for this property'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        bookings = listing.bookings.all()
+        bookings = listing.bookings.select_related(
+            'user', 'status_info', 'property', 'property__host'
+        ).prefetch_related(models.Prefetch('property__reviews', queryset=_REVIEW_QS))
+        page = self.paginate_queryset(bookings)
+        if page is not None:
+            serializer = BookingSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = BookingSerializer(bookings, many=True)
         return Response(serializer.data)
 
@@ -210,9 +385,23 @@ class ListingViewSet(viewsets.ModelViewSet):
         Get all listings for the current user
         Endpoint: GET /api/listings/my_listings/
         """
-        listings = Listing.objects.filter(host=request.user)
-        serializer = self.get_serializer(listings, many=True)
-        return Response(serializer.data)
+        key = user_cache_key(
+            request.user.user_id,
+            f'my_listings:{request.query_params.urlencode()}'
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        listings = self.get_queryset().filter(host=request.user)
+        page = self.paginate_queryset(listings)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(self.get_serializer(listings, many=True).data)
+        cache.set(key, response.data, RESPONSE_CACHE_TTL)
+        return response
 
 
 class BookingViewSet(viewsets.ModelViewSet):
@@ -227,7 +416,17 @@ class BookingViewSet(viewsets.ModelViewSet):
     Partial Update: PATCH /api/bookings/{booking_id}/
     Delete: DELETE /api/bookings/{booking_id}/
     """
-    queryset = Booking.objects.all().select_related('property', 'user', 'status')
+    queryset = Booking.objects.all().select_related(
+        'property', 'property__host', 'user', 'status_info'
+    ).only(
+        'booking_id', 'start_date', 'end_date', 'total_price', 'created_at',
+        'property__property_id', 'property__name', 'property__description',
+        'property__location', 'property__price_per_night',
+        'property__created_at', 'property__updated_at',
+        *[f'property__host__{f}' for f in _HOST_FIELDS],
+        *[f'user__{f}' for f in _HOST_FIELDS],
+        'status_info__status_id', 'status_info__status_name',
+    ).prefetch_related(models.Prefetch('property__reviews', queryset=_REVIEW_QS))
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     lookup_field = 'booking_id'
@@ -251,11 +450,19 @@ class BookingViewSet(viewsets.ModelViewSet):
         unless they are the property host
         """
         user = self.request.user
-        
-        # Get bookings where user is either the guest or the host
-        return Booking.objects.filter(
+
+        # Get bookings where user is either the guest or the host,
+        # building on the eager-loaded base queryset. Both joins are
+        # many-to-one, so the OR cannot duplicate rows and no DISTINCT
+        # (with its dedup sort) is needed.
+        queryset = super().get_queryset().filter(
             models.Q(user=user) | models.Q(property__host=user)
-        ).distinct()
+        )
+        # Write-path actions read the row they are about to update, so pin
+        # them to the primary instead of a possibly-lagging replica
+        if self.action in ('confirm', 'cancel'):
+            queryset = queryset.using('default')
+        return queryset
 
     def perform_create(self, serializer):
         """
@@ -263,13 +470,17 @@ class BookingViewSet(viewsets.ModelViewSet):
         and trigger email notification
         """
         booking = serializer.save(user=self.request.user)
-        
+
         # Import here to avoid circular imports
         from .tasks import send_booking_confirmation_email
-        
-        # Trigger email task asynchronously using Celery
-        send_booking_confirmation_email.delay(str(booking.booking_id))
-        
+
+        # Queue the email only once the row is committed, so a fast worker
+        # can't pick up the task before the booking is visible
+        booking_id = str(booking.booking_id)
+        transaction.on_commit(
+            lambda: send_booking_confirmation_email.delay(booking_id)
+        )
+
         logger.info(f"Booking created: {booking.booking_id}. Email task queued.")
 
     @action(detail=True, methods=['post'])
@@ -280,18 +491,22 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         booking = self.get_object()
         
-        # Only the host can confirm bookings
-        if request.user != booking.property.host:
+        # Only the host can confirm bookings; the host_id FK column is
+        # already loaded, so no relation traversal is needed
+        if request.user.user_id != booking.property.host_id:
             return Response(
                 {'error': 'Only the host can confirm bookings'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Update booking status
-        confirmed_status = BookingStatus.objects.get(status_name='confirmed')
-        booking.status = confirmed_status
-        booking.save()
-        
+        # Targeted UPDATE on the status column only; the in-memory instance
+        # is patched so serialization reuses the already-loaded relations
+        booking.status_info = get_booking_status('confirmed')
+        Booking.objects.filter(pk=booking.pk).update(status_info=booking.status_info)
+        # update() skips signals, so invalidate cached responses directly
+        bump_user_cache_version(booking.user_id)
+        bump_user_cache_version(booking.property.host_id)
+
         serializer = self.get_serializer(booking)
         return Response(serializer.data)
 
@@ -303,18 +518,22 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         booking = self.get_object()
         
-        # Only the guest or host can cancel
-        if request.user not in [booking.user, booking.property.host]:
+        # Only the guest or host can cancel; plain pk comparison against
+        # the already-loaded FK columns, no instance hydration
+        if request.user.user_id not in (booking.user_id, booking.property.host_id):
             return Response(
                 {'error': 'You do not have permission to cancel this booking'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Update booking status
-        cancelled_status = BookingStatus.objects.get(status_name='cancelled')
-        booking.status = cancelled_status
-        booking.save()
-        
+        # Targeted UPDATE on the status column only; the in-memory instance
+        # is patched so serialization reuses the already-loaded relations
+        booking.status_info = get_booking_status('cancelled')
+        Booking.objects.filter(pk=booking.pk).update(status_info=booking.status_info)
+        # update() skips signals, so invalidate cached responses directly
+        bump_user_cache_version(booking.user_id)
+        bump_user_cache_version(booking.property.host_id)
+
         serializer = self.get_serializer(booking)
         return Response(serializer.data)
 
@@ -324,9 +543,23 @@ class BookingViewSet(viewsets.ModelViewSet):
         Get all bookings for the current user (as guest)
         Endpoint: GET /api/bookings/my_bookings/
         """
-        bookings = Booking.objects.filter(user=request.user)
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+        key = user_cache_key(
+            request.user.user_id,
+            f'my_bookings:{request.query_params.urlencode()}'
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        bookings = self.get_queryset().filter(user=request.user)
+        page = self.paginate_queryset(bookings)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(self.get_serializer(bookings, many=True).data)
+        cache.set(key, response.data, RESPONSE_CACHE_TTL)
+        return response
 
     @action(detail=False, methods=['get'])
     def hosting_bookings(self, request):
@@ -334,9 +567,23 @@ class BookingViewSet(viewsets.ModelViewSet):
         Get all bookings for properties hosted by the current user
         Endpoint: GET /api/bookings/hosting_bookings/
         """
-        bookings = Booking.objects.filter(property__host=request.user)
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+        key = user_cache_key(
+            request.user.user_id,
+            f'hosting_bookings:{request.query_params.urlencode()}'
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        bookings = self.get_queryset().filter(property__host=request.user)
+        page = self.paginate_queryset(bookings)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(self.get_serializer(bookings, many=True).data)
+        cache.set(key, response.data, RESPONSE_CACHE_TTL)
+        return response
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
@@ -349,27 +596,28 @@ class ReviewViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     lookup_field = 'review_id'
 
-    def perform_create(self, serializer):
+    def _touch_listing(self, property_id):
         """
-        Set the user to the current user when creating a review
+        Bump the listing's updated_at so its timestamp-keyed detail and
+        reviews cache entries roll over (update() bypasses auto_now)
         """
-        serializer.save(user=self.request.user)
-
-class ReviewViewSet(viewsets.ModelViewSet):
-    """
-    ViewSet for Review model.
-    Provides CRUD operations for reviews.
-    """
-    queryset = Review.objects.all().select_related('property', 'user')
-    serializer_class = ReviewSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
-    lookup_field = 'review_id'
+        Listing.objects.filter(pk=property_id).update(updated_at=timezone.now())
 
     def perform_create(self, serializer):
         """
         Set the user to the current user when creating a review
         """
-        serializer.save(user=self.request.user)
+        review = serializer.save(user=self.request.user)
+        self._touch_listing(review.property_id)
+
+    def perform_update(self, serializer):
+        review = serializer.save()
+        self._touch_listing(review.property_id)
+
+    def perform_destroy(self, instance):
+        property_id = instance.property_id
+        instance.delete()
+        self._touch_listing(property_id)
 
 
 class PaymentInitiateView(generics.CreateAPIView):
@@ -394,69 +642,84 @@ class PaymentInitiateView(generics.CreateAPIView):
         booking_id = serializer.validated_data['booking_id']
         
         try:
-            # Get the booking
-            booking = Booking.objects.select_related('property', 'user').get(
-                booking_id=booking_id
-            )
-            
-            # Verify the user owns this booking
-            if booking.user != request.user:
-                return Response(
-                    {'error': 'You do not have permission to pay for this booking'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
-            # Check if payment already exists and is completed
-            existing_payment = Payment.objects.filter(
-                booking=booking,
-                payment_status='completed'
-            ).first()
-            
-            if existing_payment:
-                return Response(
-                    {'error': 'This booking has already been paid for'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Get or create payment method
-            payment_method, _ = PaymentMethod.objects.get_or_create(
-                method_name='chapa'
-            )
-            
-            # Initialize Chapa service
-            chapa_service = ChapaService()
-            
+            # Lock the booking row while validating so two concurrent
+            # initiations can't both pass the completed-payment check
+            # Pinned to the primary: locking reads make no sense on a replica
+            with transaction.atomic():
+                # The user join is gone: the ownership check compares the
+                # FK column and the payment row is built from request.user
+                booking = Booking.objects.using('default').select_for_update(
+                ).select_related('property').get(booking_id=booking_id)
+
+                # Verify the user owns this booking (pk comparison on the
+                # loaded FK column)
+                if booking.user_id != request.user.user_id:
+                    return Response(
+                        {'error': 'You do not have permission to pay for this booking'},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
+
+                # Check if payment already exists and is completed
+                if Payment.objects.using('default').filter(
+                    booking=booking,
+                    payment_status='completed'
+                ).exists():
+                    return Response(
+                        {'error': 'This booking has already been paid for'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+            # Get or create payment method (cached after the first call)
+            payment_method = get_payment_method('chapa')
+
+            # Get the shared Chapa service instance
+            chapa_service = get_chapa_service()
+
             # Prepare callback and return URLs
-            callback_url = f"{request.build_absolute_uri('/api/payments/webhook/')}"
-            return_url = f"{settings.FRONTEND_URL}/bookings/{booking_id}/payment-success"
-            
-            # Initialize payment with Chapa
+            callback_url = _webhook_url(request)
+            return_url = f"{_FRONTEND_URL}/bookings/{booking_id}/payment-success"
+
+            # Initialize payment with Chapa -- deliberately outside the
+            # transaction so the row lock isn't held across HTTP I/O
             payment_response = chapa_service.initialize_payment(
                 booking=booking,
                 user=request.user,
                 callback_url=callback_url,
                 return_url=return_url
             )
-            
+
             if payment_response['status'] == 'error':
                 return Response(
                     {'error': payment_response['message']},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            # Create payment record
-            payment = Payment.objects.create(
-                booking=booking,
-                amount=booking.total_price,
-                payment_status='pending',
-                chapa_reference=payment_response['tx_ref'],
-                payment_method=payment_method,
-                currency='ETB',
-                customer_email=request.user.email,
-                customer_first_name=request.user.first_name or '',
-                customer_last_name=request.user.last_name or '',
-                customer_phone=request.user.phone_number or ''
-            )
+
+            # Re-take the lock to create the payment record: re-check under
+            # the lock since it was released during the Chapa call
+            with transaction.atomic():
+                Booking.objects.using('default').select_for_update().only(
+                    'booking_id'
+                ).get(booking_id=booking_id)
+                if Payment.objects.using('default').filter(
+                    booking=booking,
+                    payment_status='completed'
+                ).exists():
+                    return Response(
+                        {'error': 'This booking has already been paid for'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                payment = Payment.objects.create(
+                    booking=booking,
+                    amount=booking.total_price,
+                    payment_status='pending',
+                    chapa_reference=payment_response['tx_ref'],
+                    payment_method=payment_method,
+                    currency='ETB',
+                    customer_email=request.user.email,
+                    customer_first_name=request.user.first_name or '',
+                    customer_last_name=request.user.last_name or '',
+                    customer_phone=request.user.phone_number or ''
+                )
             
             logger.info(f"Payment initiated: {payment.payment_id}")
             
@@ -492,23 +755,26 @@ class PaymentVerifyView(generics.RetrieveAPIView):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = PaymentVerifyResponseSerializer
-    lookup_field = 'tx_ref'
+    lookup_field = 'chapa_reference'
     lookup_url_kwarg = 'tx_ref'
-    
+
     def get_queryset(self):
-        return Payment.objects.select_related('booking')
-    
-    def get_object(self):
-        queryset = self.filter_queryset(self.get_queryset())
-        filter_kwargs = {self.lookup_field: self.kwargs[self.lookup_url_kwarg]}
-        obj = get_object_or_404(queryset, **filter_kwargs)
-        
-        # Verify user has permission
-        if obj.booking.user != self.request.user:
-            raise PermissionDenied("You do not have permission to verify this payment")
-            
-        return obj
-    
+        # Ownership is part of the WHERE clause, so "not found" and "not
+        # yours" both 404 in one query (no user enumeration) and no
+        # post-fetch permission check is needed. PaymentResponseSerializer
+        # is flat; beyond its fields only the booking pk and owner FK (for
+        # the status update and cache bump) are kept. Pinned to the
+        # primary: a payment is often verified moments after being
+        # inserted, within replica lag.
+        return Payment.objects.using('default').filter(
+            booking__user=self.request.user
+        ).select_related('booking').only(
+            'payment_id', 'amount', 'payment_status', 'transaction_id',
+            'chapa_reference', 'payment_date', 'currency', 'customer_email',
+            'booking__booking_id', 'booking__user',
+        )
+
+
     def get(self, request, *args, **kwargs):
         """
         Verify a payment transaction
@@ -517,8 +783,8 @@ class PaymentVerifyView(generics.RetrieveAPIView):
         tx_ref = self.kwargs.get(self.lookup_url_kwarg)
         
         try:
-            # Initialize Chapa service and verify payment
-            chapa_service = ChapaService()
+            # Verify payment using the shared Chapa service instance
+            chapa_service = get_chapa_service()
             verification_result = chapa_service.verify_payment(tx_ref)
             
             if verification_result['status'] == 'error':
@@ -531,31 +797,44 @@ class PaymentVerifyView(generics.RetrieveAPIView):
             payment_data = verification_result.get('data', {})
             chapa_status = payment_data.get('status', '').lower()
             
-            # Update payment status
-            if chapa_status == 'success':
+            # Update payment status. Each branch is gated on the stored
+            # status, so re-verifying an already-settled payment (client
+            # polling, webhook retries racing this view) costs the initial
+            # SELECT only and never re-queues emails.
+            if chapa_status == 'success' and payment.payment_status != 'completed':
+                # Targeted UPDATEs touching only the changed columns, in one
+                # transaction instead of two full-row autocommit saves
                 payment.payment_status = 'completed'
                 payment.transaction_id = payment_data.get('reference')
-                payment.save()
-                
-                # Update booking status to confirmed
-                confirmed_status, _ = BookingStatus.objects.get_or_create(
-                    status_name='confirmed'
-                )
-                payment.booking.status = confirmed_status
-                payment.booking.save()
-                
-                # Send confirmation email (async with Celery)
-                send_payment_confirmation_email.delay(str(payment.payment_id))
-                
+                payment_id = str(payment.payment_id)
+                with transaction.atomic():
+                    Payment.objects.filter(pk=payment.pk).update(
+                        payment_status='completed',
+                        transaction_id=payment.transaction_id,
+                    )
+                    Booking.objects.filter(pk=payment.booking_id).update(
+                        status_info=get_booking_status('confirmed')
+                    )
+                    # Queue the email on commit so the worker never sees a
+                    # pre-commit row
+                    transaction.on_commit(
+                        lambda: send_payment_confirmation_email.delay(payment_id)
+                    )
+
+                # update() skips signals, so invalidate the cached
+                # responses directly
+                bump_user_cache_version(payment.booking.user_id)
+
                 logger.info(f"Payment completed: {payment.payment_id}")
-                
-            elif chapa_status == 'failed':
+
+            elif chapa_status == 'failed' and payment.payment_status != 'failed':
                 payment.payment_status = 'failed'
-                payment.save()
-                
+                Payment.objects.filter(pk=payment.pk).update(payment_status='failed')
+                bump_user_cache_version(payment.booking.user_id)
+
                 # Send failure email
                 send_payment_failed_email.delay(str(payment.payment_id))
-                
+
                 logger.warning(f"Payment failed: {payment.payment_id}")
             
             # Return updated payment status
@@ -585,80 +864,48 @@ class PaymentWebhookView(APIView):
     
     def post(self, request):
         """
-        Handle webhook notification from Chapa
-        """
-        try:
-            webhook_data = request.data
-            tx_ref = webhook_data.get('tx_ref')
-            
-            if not tx_ref:
+        Handle webhook notification from Chapa.
+
+        Chapa only needs an acknowledgement, so the verification round-trip
+        and DB updates run in a Celery task; the request thread is never
+        blocked on outbound HTTP.
+        """
+        # Authenticate the sender before touching the cache, queue or DB:
+        # a bogus or flooded webhook costs one HMAC over the body and
+        # nothing else
+        if _WEBHOOK_SECRET:
+            signature = request.META.get('HTTP_CHAPA_SIGNATURE', '')
+            expected = hmac.new(
+                _WEBHOOK_SECRET, request.body, hashlib.sha256
+            ).hexdigest()
+            if not hmac.compare_digest(signature, expected):
+                logger.warning("Webhook rejected: invalid signature")
                 return Response(
-                    {'error': 'tx_ref is required'},
-                    status=status.HTTP_400_BAD_REQUEST
+                    {'error': 'Invalid signature'},
+                    status=status.HTTP_401_UNAUTHORIZED
                 )
-            
-            # Process webhook using Chapa service
-            chapa_service = ChapaService()
-            result = chapa_service.handle_webhook(webhook_data)
-            
-            if result['status'] == 'error':
-                logger.error(f"Webhook processing error: {result['message']}")
-                return Response(
-                    {'error': result['message']},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Get payment record
-            payment = Payment.objects.select_related('booking').get(
-                chapa_reference=tx_ref
-            )
-            
-            # Update payment status based on webhook
-            payment_status = result.get('payment_status', '').lower()
-            
-            if payment_status == 'success':
-                payment.payment_status = 'completed'
-                payment.transaction_id = webhook_data.get('reference')
-                payment.save()
-                
-                # Update booking status
-                confirmed_status, _ = BookingStatus.objects.get_or_create(
-                    status_name='confirmed'
-                )
-                payment.booking.status = confirmed_status
-                payment.booking.save()
-                
-                # Send confirmation email
-                send_payment_confirmation_email.delay(str(payment.payment_id))
-                
-                logger.info(f"Webhook: Payment completed {payment.payment_id}")
-                
-            elif payment_status == 'failed':
-                payment.payment_status = 'failed'
-                payment.save()
-                
-                # Send failure email
-                send_payment_failed_email.delay(str(payment.payment_id))
-                
-                logger.warning(f"Webhook: Payment failed {payment.payment_id}")
-            
+
+        serializer = WebhookSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tx_ref = serializer.validated_data['tx_ref']
+
+        # Chapa delivers webhooks at-least-once; cache.add is an atomic
+        # SETNX, so retried deliveries short-circuit without queueing a
+        # second verification
+        if not cache.add(f'webhook:{tx_ref}', 1, timeout=600):
+            logger.info("Duplicate webhook for %s ignored", tx_ref)
             return Response({
-                'status': 'success',
-                'message': 'Webhook processed successfully'
+                'status': 'accepted',
+                'message': 'Webhook already being processed'
             })
-            
-        except Payment.DoesNotExist:
-            logger.error(f"Payment not found for tx_ref: {tx_ref}")
-            return Response(
-                {'error': 'Payment not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        except Exception as e:
-            logger.error(f"Error processing webhook: {str(e)}")
-            return Response(
-                {'error': f'An error occurred: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+
+        process_payment_verification.delay(tx_ref)
+        logger.info("Webhook accepted for %s; verification queued", tx_ref)
+
+        return Response(
+            {'status': 'accepted', 'message': 'Webhook queued for processing'},
+            status=status.HTTP_202_ACCEPTED
+        )
 
 
 class PaymentListView(generics.ListAPIView):
@@ -669,9 +916,40 @@ class PaymentListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PaymentListSerializer
     queryset = Payment.objects.none()
-    
+
+    # Columns mirroring PaymentListSerializer.Meta.fields
+    LIST_FIELDS = (
+        'payment_id', 'amount', 'payment_status', 'payment_date',
+        'currency', 'chapa_reference', 'booking_id',
+    )
+
+    def list(self, request, *args, **kwargs):
+        key = user_cache_key(
+            request.user.user_id,
+            f'payments:{request.query_params.urlencode()}'
+        )
+        # The response shape is fixed, so the cache stores the rendered
+        # JSON bytes: a hit skips serialization and rendering entirely
+        payload = cache.get(key)
+        if payload is not None:
+            return HttpResponse(payload, content_type='application/json')
+
+        # values() yields dict rows straight off the DB cursor: no model
+        # instantiation and no per-field serializer pass. The serializer is
+        # read-only and flat, so the rows match its output exactly and the
+        # renderer encodes UUID/Decimal/datetime natively.
+        rows = self.get_queryset().values(*self.LIST_FIELDS)
+        page = self.paginate_queryset(rows)
+        data = self.get_paginated_response(page).data if page is not None else list(rows)
+        payload = JSONRenderer().render(data)
+        cache.set(key, payload, RESPONSE_CACHE_TTL)
+        return HttpResponse(payload, content_type='application/json')
+
     def get_queryset(self):
-        return Payment.objects.filter(user=self.request.user).select_related('booking', 'booking__property')
+        # PaymentListSerializer is flat (booking_id is the FK column), so no
+        # joins are needed; filtering goes through booking__user since
+        # Payment itself has no user field
+        return Payment.objects.filter(booking__user=self.request.user)
 
 
 class PaymentDetailView(generics.RetrieveAPIView):
@@ -685,23 +963,14 @@ class PaymentDetailView(generics.RetrieveAPIView):
     lookup_field = 'payment_id'
     
     def get_queryset(self):
-        return super().get_queryset().select_related(
-            'booking', 'booking__property', 'booking__user'
-        )
-        
-    def retrieve(self, request, *args, **kwargs):
-        try:
-            payment = self.get_object()
-            # Verify user has permission
-            if payment.booking.user != request.user:
-                return Response(
-                    {'error': 'You do not have permission to view this payment'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            serializer = self.get_serializer(payment)
-            return Response(serializer.data)
-        except Payment.DoesNotExist:
-            return Response(
-                {'error': 'Payment not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+        # Ownership lives in the WHERE clause: other users' payments 404
+        # uniformly and the post-fetch permission check (with its
+        # booking__user join) is gone. The serializer is flat, so only the
+        # booking pk is kept beyond its fields.
+        return super().get_queryset().filter(
+            booking__user=self.request.user
+        ).select_related('booking').only(
+            'payment_id', 'amount', 'payment_status', 'transaction_id',
+            'chapa_reference', 'payment_date', 'currency', 'customer_email',
+            'booking__booking_id',
+        )
\ No newline at end of file
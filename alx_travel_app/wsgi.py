@@ -14,3 +14,42 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_travel_app.settings')
 
 application = get_wsgi_application()
+
+
+def _warmup():
+    """
+    Pre-load hot imports and connections at worker boot so the first real
+    request doesn't pay for them. Run gunicorn/uwsgi with --preload so this
+    happens once before forking and the pages are shared copy-on-write.
+    """
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+
+    try:
+        from django.db import connection
+        connection.ensure_connection()
+    except Exception:
+        # The database may not be reachable yet at boot; the first request
+        # will connect normally
+        pass
+
+    from listings.services import get_chapa_service
+    get_chapa_service()
+
+    # Drive one synthetic request through the stack so middleware, DRF
+    # serializers and renderers are imported before real traffic arrives.
+    # Set DJANGO_WARMUP=0 to skip (e.g. management commands via wsgi).
+    if os.environ.get('DJANGO_WARMUP', '1') == '1':
+        from wsgiref.util import setup_testing_defaults
+        try:
+            environ = {}
+            setup_testing_defaults(environ)
+            environ['HTTP_HOST'] = 'healthcheck'
+            application(environ, lambda *args, **kwargs: None)
+        except Exception:
+            # Warmup is best-effort; a failing synthetic request must not
+            # stop the worker from booting
+            pass
+
+
+_warmup()
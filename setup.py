@@ -8,7 +8,6 @@ setup(
         # List your project dependencies here
         'Django>=4.2.0',
         'djangorestframework',
-        'drf-yasg',
         'python-dotenv',
         'django-environ',
     ],